@@ -0,0 +1,77 @@
+"""Shows that Plugin.run_cpu keeps the event loop responsive.
+
+Parses a large JSON payload and extracts a small result from it, like the
+Bilibili plugin does with mini-app cards, once inline on the event loop and
+once through the process pool, while a monitor task measures how late the
+loop wakes up. Run from the repository root::
+
+    python -m benchmarks.run_cpu_latency
+"""
+import asyncio
+import json
+import time
+
+from plana import Plugin
+from plana.core.config import PlanaConfig
+from plana.core.executor import create_process_pool, warm_up_process_pool
+
+PAYLOAD = json.dumps(
+    {"meta": {"items": [{"title": "x" * 64, "id": i} for i in range(200_000)]}}
+)
+ROUNDS = 5
+
+
+def count_items(payload: str) -> int:
+    return len(json.loads(payload)["meta"]["items"])
+
+
+async def monitor(lags: list[float], interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def measure(name: str, parse) -> None:
+    lags: list[float] = []
+    task = asyncio.create_task(monitor(lags))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await parse()
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    lags.sort()
+    print(
+        f"{name:<8} {elapsed:6.2f}s  loop lag "
+        f"p50={lags[len(lags) // 2] * 1000:7.2f}ms max={lags[-1] * 1000:7.2f}ms"
+    )
+
+
+async def main() -> None:
+    executor = create_process_pool(2)
+    await warm_up_process_pool(executor, 2)
+    plugin = Plugin(
+        queue=asyncio.Queue(),
+        lock=asyncio.Lock(),
+        response={},
+        config=PlanaConfig(),
+        executor=executor,
+    )
+
+    async def inline():
+        count_items(PAYLOAD)
+
+    async def offloaded():
+        await plugin.run_cpu(count_items, PAYLOAD)
+
+    print(f"payload {len(PAYLOAD) / 1024 / 1024:.1f}MiB x {ROUNDS}")
+    await measure("inline", inline)
+    await measure("run_cpu", offloaded)
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
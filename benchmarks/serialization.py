@@ -0,0 +1,87 @@
+"""Measures how long outbound actions take to serialize.
+
+Compares ``Action.dict()`` followed by ``json.dumps``, which is what the send
+loop did before ``Action.to_json``, with ``to_json`` on the stdlib encoder and
+on orjson. Uses a one-segment ``send_group_msg`` replying to a message and a
+large ``send_group_forward_msg``. Run from the repository root::
+
+    python -m benchmarks.serialization
+"""
+import json
+import timeit
+from typing import Callable
+
+import plana.actions.action as action_module
+from plana.actions import Action
+from plana.actions.reply import create_reply
+from plana.actions.send_group_forward_msg import SendGroupForwardMessage
+from plana.actions.send_group_msg import SendGroupMessage
+from plana.messages import Message
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def typical() -> Action:
+    message = Message([create_reply(1)])
+    message.add_text("你好, Plana")
+    return SendGroupMessage(params={"group_id": 1, "message": message})
+
+
+def large_forward() -> Action:
+    nodes = []
+    for i in range(100):
+        content = Message()
+        for _ in range(10):
+            content.add_text(f"第 {i} 段, 一些比较长的文字. " * 10)
+        nodes.append(
+            {"type": "node", "data": {"name": "Plana", "uin": 1, "content": content}}
+        )
+    return SendGroupForwardMessage(params={"group_id": 1, "messages": nodes})
+
+
+def dict_then_json(action: Action) -> str:
+    return json.dumps(action.dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+def to_json_with(dumps: Callable[[object], str]) -> Callable[[Action], str]:
+    def encode(action: Action) -> str:
+        action_module.dumps = dumps
+        return action.to_json()
+
+    return encode
+
+
+def stdlib_dumps(obj: object) -> str:
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=action_module._default
+    )
+
+
+def main() -> None:
+    encoders = {
+        "dict() + json": dict_then_json,
+        "to_json, json": to_json_with(stdlib_dumps),
+    }
+    if orjson:
+        encoders["to_json, orjson"] = to_json_with(
+            lambda obj: orjson.dumps(obj, default=action_module._default).decode()
+        )
+    else:
+        print("orjson is not installed, skipping it")
+
+    original = action_module.dumps
+    for name, action in [("typical", typical()), ("large forward", large_forward())]:
+        size = len(dict_then_json(action).encode())
+        print(f"{name} ({size / 1024:.1f}KiB)")
+        for encoder_name, encode in encoders.items():
+            number, _ = timeit.Timer(lambda: encode(action)).autorange()
+            seconds = min(timeit.repeat(lambda: encode(action), number=number))
+            print(f"  {encoder_name:<16} {seconds / number * 1e6:10.2f}us")
+        action_module.dumps = original
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measures KVStore throughput for many small writes and hot-path reads.
+
+Writes ``set`` and ``incr`` calls as fast as one coroutine can issue them and
+compares them with a write-through store that commits every write to SQLite
+from a thread, which is what plugins did before the store existed. Reads hit
+keys that are already cached. Run from the repository root::
+
+    python -m benchmarks.store
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from plana.core.store import KVStore
+
+WRITES = 50_000
+WRITE_THROUGH = 2_000
+READS = 200_000
+KEYS = 1_000
+
+
+def report(name: str, count: int, elapsed: float) -> None:
+    print(f"{name:<28} {count / elapsed:12.0f}/s  {elapsed * 1e6 / count:8.2f}us/op")
+
+
+async def write_through(path: str) -> None:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE kv (namespace TEXT, key TEXT, value TEXT, "
+        "PRIMARY KEY (namespace, key))"
+    )
+
+    def write(key: str, value: str) -> None:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", ("bench", key, value)
+            )
+
+    start = time.perf_counter()
+    for i in range(WRITE_THROUGH):
+        await asyncio.to_thread(write, f"key{i % KEYS}", str(i))
+    report("write-through set", WRITE_THROUGH, time.perf_counter() - start)
+    conn.close()
+
+
+async def main() -> None:
+    workdir = tempfile.mkdtemp()
+    store = KVStore(os.path.join(workdir, "store.db"))
+    store.start()
+    await store.get("bench", "warm-up")
+
+    start = time.perf_counter()
+    for i in range(WRITES):
+        await store.set("bench", f"key{i % KEYS}", {"count": i, "user": 10000 + i})
+    report("set", WRITES, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(WRITES):
+        await store.incr("bench", f"counter{i % KEYS}")
+    report("incr", WRITES, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(READS):
+        await store.get("bench", f"key{i % KEYS}")
+    report("get, cached", READS, time.perf_counter() - start)
+
+    dirty = len(store.dirty)
+    start = time.perf_counter()
+    await store.flush()
+    report(f"flush of {dirty} dirty keys", dirty, time.perf_counter() - start)
+    await store.close()
+
+    await write_through(os.path.join(workdir, "write_through.db"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
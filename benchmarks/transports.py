@@ -0,0 +1,180 @@
+"""Compares go-cqhttp transports against a local stand-in server.
+
+Request/response actions: ``get_login_info`` over the reverse websocket (echo
+bookkeeping, one send loop) and over the HTTP API connection pool, with the
+stand-in answering after ``DELAY`` seconds. Both run once without a rate limit
+and once with the default ``send_interval``, which the websocket send loop
+applies to every action while HTTP API calls that wait for a response bypass
+it. Event ingestion: HTTP POST with one event per request and with batched
+requests. The stand-in HTTP API runs in its own process, Plana and the
+clients share one event loop. Without a rate limit the HTTP API numbers are
+bound by the CPU httpx spends per request, not by the connection pool. Run
+from the repository root::
+
+    python -m benchmarks.transports
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI
+
+from plana import Plana, Plugin
+from plana.core.config import PlanaConfig
+from plana.core.transport import HttpApiClient
+
+PLANA_PORT = 18000
+API_PORT = 15700
+DELAY = 0.005
+CALLS = 200
+# With send_interval each websocket action waits its turn, keep this small.
+RATE_LIMITED_CALLS = 5
+EVENTS = 2000
+BATCH = 50
+LOGIN_INFO = {"nickname": "plana", "user_id": 1}
+
+api = FastAPI()
+
+
+@api.post("/{action}")
+async def http_api(action: str) -> dict:
+    await asyncio.sleep(DELAY)
+    return {"status": "ok", "retcode": 0, "data": LOGIN_INFO}
+
+
+async def ws_client(stop: asyncio.Event) -> None:
+    """Plays go-cqhttp on the reverse websocket: answers every echoed action."""
+    async with websockets.connect(f"ws://127.0.0.1:{PLANA_PORT}/ws") as ws:
+
+        async def answer(action: dict) -> None:
+            await asyncio.sleep(DELAY)
+            await ws.send(
+                json.dumps(
+                    {
+                        "status": "ok",
+                        "retcode": 0,
+                        "data": LOGIN_INFO,
+                        "echo": action["echo"],
+                    }
+                )
+            )
+
+        while not stop.is_set():
+            try:
+                frame = await asyncio.wait_for(ws.recv(), 0.1)
+            except asyncio.TimeoutError:
+                continue
+            asyncio.create_task(answer(json.loads(frame)))
+
+
+async def serve(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="critical"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def calls(plugin: Plugin, count: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+
+    async def call() -> None:
+        start = time.perf_counter()
+        await plugin.get_login_info()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call() for _ in range(count)])
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name: str, elapsed: float, count: int, latencies: list[float]) -> None:
+    line = f"{name:<24} {count / elapsed:9.0f}/s"
+    if latencies:
+        line += (
+            f"  p50={latencies[len(latencies) // 2] * 1000:7.2f}ms"
+            f"  p99={latencies[len(latencies) * 99 // 100] * 1000:7.2f}ms"
+        )
+    print(line)
+
+
+async def wait_for_api() -> None:
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.post(f"http://127.0.0.1:{API_PORT}/get_status")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+
+
+async def main() -> None:
+    api_process = multiprocessing.Process(
+        target=uvicorn.run,
+        args=(api,),
+        kwargs={"port": API_PORT, "log_level": "critical"},
+        daemon=True,
+    )
+    api_process.start()
+    await wait_for_api()
+
+    workdir = tempfile.mkdtemp()
+    bot = Plana()
+    bot.config.plugins_dir = os.path.relpath(workdir)
+    bot.config.store_path = os.path.join(workdir, "plana.db")
+    bot.config.process_pool_workers = 0
+    plana_server = await serve(bot.app, PLANA_PORT)
+
+    plugin = Plugin(
+        queue=bot.request_queue,
+        lock=bot.lock,
+        response=bot.response,
+        config=bot.config,
+    )
+    http_api = HttpApiClient(f"http://127.0.0.1:{API_PORT}", pool_size=20)
+    stop = asyncio.Event()
+    client = asyncio.create_task(ws_client(stop))
+    while not bot.subscribers:
+        await asyncio.sleep(0.01)
+    for send_interval in [0, PlanaConfig().send_interval]:
+        bot.config.send_interval = send_interval
+        count = CALLS if send_interval == 0 else RATE_LIMITED_CALLS
+        print(f"send_interval={send_interval}, {count} concurrent calls")
+        plugin.http_api = None
+        elapsed, latencies = await calls(plugin, count)
+        report("websocket get_login_info", elapsed, count, latencies)
+        plugin.http_api = http_api
+        elapsed, latencies = await calls(plugin, count)
+        report("http api get_login_info", elapsed, count, latencies)
+    stop.set()
+    await client
+    await http_api.close()
+
+    event = {"post_type": "meta_event", "meta_event_type": "heartbeat"}
+    url = f"http://127.0.0.1:{PLANA_PORT}/event"
+    limits = httpx.Limits(max_connections=20)
+    async with httpx.AsyncClient(limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*[http.post(url, json=event) for _ in range(EVENTS)])
+        report("http post, 1 per request", time.perf_counter() - start, EVENTS, [])
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[http.post(url, json=[event] * BATCH) for _ in range(EVENTS // BATCH)]
+        )
+        elapsed = time.perf_counter() - start
+        report(f"http post, {BATCH} per request", elapsed, EVENTS, [])
+
+    plana_server.should_exit = True
+    api_process.terminate()
+    await asyncio.sleep(0.5)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
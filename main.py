@@ -1,4 +1,5 @@
 from plana import Plana
 
-bot = Plana()
-bot.run()
+if __name__ == "__main__":
+    bot = Plana()
+    bot.run()
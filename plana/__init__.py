@@ -1,2 +1,3 @@
+from plana.core.command import command
 from plana.core.plana import Plana
 from plana.core.plugin import Plugin
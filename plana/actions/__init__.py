@@ -1,5 +1,7 @@
 from plana.actions.action import Action
 from plana.actions.get_group_member_info import GroupMemberInfo
 from plana.actions.get_login_info import GetLoginInfo, LoginInfo
+from plana.actions.send_group_forward_msg import SendGroupForwardMessage
 from plana.actions.send_group_msg import SendGroupMessage
+from plana.actions.send_private_forward_msg import SendPrivateForwardMessage
 from plana.actions.send_private_msg import SendPrivateMessage
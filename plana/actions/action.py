@@ -1,7 +1,46 @@
+import json
+from typing import Any
+
 from pydantic import BaseModel
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson:
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_default).decode()
+
+else:
+    _encoder = json.JSONEncoder(
+        ensure_ascii=False, separators=(",", ":"), default=_default
+    )
+    dumps = _encoder.encode
+
+# '{"action":"send_group_msg","params":' is the same for every action of a kind,
+# encode it once per action name.
+_heads: dict[str, str] = {}
+
 
 class Action(BaseModel):
     action: str
     params: dict = {}
     echo: str = ""
+
+    def to_json(self) -> str:
+        """Encode the action without building an intermediate dict first."""
+        head = _heads.get(self.action)
+        if head is None:
+            head = _heads.setdefault(
+                self.action, f'{{"action":{dumps(self.action)},"params":'
+            )
+        return f'{head}{dumps(self.params)},"echo":{dumps(self.echo)}}}'
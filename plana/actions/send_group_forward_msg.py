@@ -0,0 +1,5 @@
+from plana.actions.action import Action
+
+
+class SendGroupForwardMessage(Action):
+    action: str = "send_group_forward_msg"
@@ -0,0 +1,5 @@
+from plana.actions.action import Action
+
+
+class SendPrivateForwardMessage(Action):
+    action: str = "send_private_forward_msg"
@@ -0,0 +1,153 @@
+import inspect
+import re
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from plana.core.plugin import Plugin
+    from plana.messages import BaseMessage
+
+ARG_PATTERNS: dict[type, str] = {
+    int: r"[+-]?\d+",
+    float: r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)",
+    str: r"\S+",
+}
+ARG_TYPES: dict[str, type] = {t.__name__: t for t in ARG_PATTERNS}
+ARG_TOKEN = re.compile(r"<(\w+)(\.\.\.)?>")
+
+
+class Command:
+    """A command handler compiled from a pattern like ``"ban <user_id> <reason...>"``.
+
+    The first word is the command name. ``<name>`` matches a single word and
+    ``<name...>`` matches the rest of the text. Arguments are converted with
+    the handler's annotations, ``int``, ``float`` and ``str`` are supported.
+    """
+
+    def __init__(
+        self, pattern: str, func: Callable, *, group: bool, private: bool
+    ) -> None:
+        self.pattern = pattern
+        self.func = func
+        self.group = group
+        self.private = private
+
+        name, *tokens = pattern.split()
+        if ARG_TOKEN.fullmatch(name):
+            raise ValueError(f"Command pattern must start with a name: {pattern}")
+        self.name = name
+
+        parameters = inspect.signature(func).parameters
+        self.converters: dict[str, type] = {}
+        parts: list[str] = []
+        for i, token in enumerate(tokens):
+            arg = ARG_TOKEN.fullmatch(token)
+            if not arg:
+                parts.append(re.escape(token))
+                continue
+            arg_name, rest = arg.groups()
+            if arg_name not in parameters:
+                raise ValueError(f"{func.__qualname__} has no argument {arg_name}")
+            if rest and i != len(tokens) - 1:
+                raise ValueError(f"<{arg_name}...> must be the last argument")
+            annotation = parameters[arg_name].annotation
+            if isinstance(annotation, str):
+                annotation = ARG_TYPES.get(annotation, annotation)
+            if annotation is inspect.Parameter.empty:
+                annotation = str
+            if annotation not in ARG_PATTERNS:
+                raise ValueError(f"Unsupported type for {arg_name}: {annotation}")
+            self.converters[arg_name] = annotation
+            regex = ".+" if rest else ARG_PATTERNS[annotation]
+            parts.append(f"(?P<{arg_name}>{regex})")
+        self.regex = re.compile(r"\s+".join(parts), re.DOTALL)
+
+    def parse(self, text: str) -> dict[str, Any] | None:
+        match = self.regex.fullmatch(text)
+        if not match:
+            return None
+        return {
+            name: self.converters[name](value)
+            for name, value in match.groupdict().items()
+        }
+
+
+class CommandMatch:
+    def __init__(
+        self,
+        command: Command,
+        kwargs: dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> None:
+        self.command = command
+        self.kwargs = kwargs or {}
+        self.error = error
+
+
+class CommandRouter:
+    """Routes ``<prefix> <name> <args>`` text to command handlers of all plugins.
+
+    Prefix and name are resolved with dictionary lookups, so only the argument
+    patterns of the commands registered under that exact name are tried.
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[str, dict[str, list[tuple["Plugin", Command]]]] = {}
+
+    def add_plugin(self, plugin: "Plugin") -> None:
+        if not plugin.prefix:
+            return
+        for command in get_commands(type(plugin)):
+            names = self.routes.setdefault(plugin.prefix, {})
+            names.setdefault(command.name, []).append((plugin, command))
+
+    def match(self, message: "BaseMessage") -> dict[int, CommandMatch]:
+        """Match a message once, keyed by ``id()`` of the plugin that handles it."""
+        if not self.routes:
+            return {}
+        prefix, name, args = (message.plain_text().split(maxsplit=2) + ["", ""])[:3]
+        routes = self.routes.get(prefix, {}).get(name)
+        if not routes:
+            return {}
+
+        routes = [
+            (plugin, command)
+            for plugin, command in routes
+            if (command.group and message.message_type == "group")
+            or (command.private and message.message_type == "private")
+        ]
+        matches: dict[int, CommandMatch] = {}
+        for plugin, command in routes:
+            if id(plugin) in matches:
+                continue
+            kwargs = command.parse(args)
+            if kwargs is not None:
+                matches[id(plugin)] = CommandMatch(command, kwargs)
+        for plugin, command in routes:
+            if id(plugin) not in matches:
+                matches[id(plugin)] = CommandMatch(
+                    command, error=f"用法: {prefix} {command.pattern}"
+                )
+        return matches
+
+
+def command(
+    pattern: str, *, group: bool = True, private: bool = True
+) -> Callable[[Callable], Callable]:
+    """Register a plugin method as a handler for ``<prefix> <pattern>``."""
+
+    def decorator(func: Callable) -> Callable:
+        func.__plana_command__ = Command(  # type: ignore[attr-defined]
+            pattern, func, group=group, private=private
+        )
+        return func
+
+    return decorator
+
+
+def get_commands(cls: type) -> list[Command]:
+    return [
+        member.__plana_command__
+        for _, member in inspect.getmembers(
+            cls, lambda member: hasattr(member, "__plana_command__")
+        )
+    ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 
 class PlanaConfig(BaseModel):
@@ -8,3 +8,32 @@ class PlanaConfig(BaseModel):
     plugins_dir: str = "plugins"
     plugins_config: dict = {}
     reply_private_message: bool = False
+    process_pool_workers: int = 2
+    cpu_task_timeout: float = 30
+    shutdown_timeout: float = 10
+    shutdown_flush_timeout: float = 20
+    http_api_url: str = ""
+    http_api_access_token: str = ""
+    http_api_pool_size: int = 10
+    http_api_timeout: float = 10
+    http_post_secret: str = ""
+    send_interval: float = 2
+    record_file: str = ""
+    record_max_bytes: int = 64 * 1024 * 1024
+    record_backups: int = 3
+    profile_dir: str = "profiles"
+    profile_token: str = ""
+    store_path: str = "plana.db"
+    store_flush_interval: float = 1
+    store_batch_size: int = 500
+    max_message_length: int = 2000
+    forward_threshold: int = 3
+    send_retries: int = 2
+    retry_on_timeout: bool = False
+    response_timeout: float = 30
+
+    @validator("max_message_length")
+    def validate_max_message_length(cls, max_message_length: int) -> int:
+        if max_message_length <= 0:
+            raise ValueError("max_message_length must be positive")
+        return max_message_length
@@ -0,0 +1,15 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+async def warm_up_process_pool(pool: ProcessPoolExecutor, max_workers: int) -> None:
+    """Start every worker up front so the first real job does not pay for it."""
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *[loop.run_in_executor(pool, os.getpid) for _ in range(max_workers)]
+    )
@@ -1,17 +1,32 @@
 import asyncio
+import hmac
 import importlib.util
 import inspect
+import json
 import logging
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Coroutine
 
+import httpx
 import uvicorn
 import yaml
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Request, Response, WebSocket
+from fastapi.responses import JSONResponse
 from loguru import logger
 
 from plana.actions import Action
+from plana.core.command import CommandRouter
 from plana.core.config import PlanaConfig
+from plana.core.executor import create_process_pool, warm_up_process_pool
 from plana.core.plugin import Plugin
+from plana.core.profiling import RuntimeProfiler
+from plana.core.recorder import Recorder
+from plana.core.server import PlanaServer
+from plana.core.stats import StageTimings
+from plana.core.store import KVStore
+from plana.core.transport import HttpApiClient, verify_signature
 from plana.messages import BaseMessage, GroupMessage, PrivateMessage
 
 
@@ -28,43 +43,182 @@ class Plana:
         self.request_queue = asyncio.Queue()
         self.subscribers: dict[str, asyncio.Queue] = {}
         self.plugins: list[Plugin] = []
+        self.router = CommandRouter()
+        self.executor: ProcessPoolExecutor | None = None
+        self.http_api: HttpApiClient | None = None
+        self.store: KVStore | None = None
         self.response: dict[str, dict] = {"_version": {}}
+        self.tasks: set[asyncio.Task] = set()
+        self.accepting = True
+        self.dropped_actions = 0
+        self.refused_events = 0
+        self.timings = StageTimings()
+        self.recorder: Recorder | None = None
 
         self._load_config(config, config_file_path)
+        if self.config.record_file:
+            self.recorder = Recorder(
+                self.config.record_file,
+                max_bytes=self.config.record_max_bytes,
+                backups=self.config.record_backups,
+            )
+        self.profiler = RuntimeProfiler(self.config.profile_dir)
         self._init_app()
 
     def run(self, host: str = "127.0.0.1", port: int = 8000) -> None:
-        return uvicorn.run(
+        config = uvicorn.Config(
             self.app,
             host=host,
             port=port,
             log_level=logging.CRITICAL,
             access_log=False,
         )
+        return PlanaServer(config, self).run()
+
+    def replay(
+        self, path: str, *, realtime: bool = False, profile: str | None = None
+    ) -> None:
+        """Feed a recording made with ``record_file`` back through the pipeline.
+
+        Outbound actions and plugin HTTP requests are stubbed. Prints how long
+        each stage took and, with ``profile``, writes cProfile stats there.
+        """
+        from plana.core.replay import Replayer
+
+        asyncio.run(Replayer(self, path, realtime=realtime).run(profile))
+
+    async def drain(self) -> None:
+        """Stop taking new events and flush in-flight work before shutdown.
+
+        Plugin tasks and every plugin's ``on_shutdown`` hook share
+        ``shutdown_timeout``, then queued outbound actions get their own
+        ``shutdown_flush_timeout`` to be sent. Whatever remains is cancelled and
+        reported. Events posted over HTTP meanwhile are refused with 503.
+        """
+        self.accepting = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.shutdown_timeout
+        logger.info(f"[Shutdown] Draining {len(self.tasks)} in-flight tasks")
+
+        while self.tasks and loop.time() < deadline:
+            await asyncio.wait(set(self.tasks), timeout=deadline - loop.time())
+
+        for plugin in self.plugins:
+            try:
+                await asyncio.wait_for(
+                    plugin.on_shutdown(), max(deadline - loop.time(), 0.1)
+                )
+            except Exception as e:
+                logger.error(
+                    f"[Shutdown] on_shutdown of {plugin.__class__.__name__} "
+                    f"failed: {e!r}"
+                )
+
+        deadline = loop.time() + self.config.shutdown_flush_timeout
+        queues = [self.request_queue, *self.subscribers.values()]
+        for queue in queues:
+            try:
+                await asyncio.wait_for(queue.join(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+
+        dropped_actions = self.dropped_actions + sum(q.qsize() for q in queues)
+        unresolved_echoes = [
+            key
+            for key, value in self.response.items()
+            if key != "_version" and "response" not in value
+        ]
+        cancelled_tasks = len(self.tasks)
+        for task in list(self.tasks):
+            task.cancel()
+        logger.info(
+            f"[Shutdown] Dropped {dropped_actions} actions, "
+            f"refused {self.refused_events} events, "
+            f"{len(unresolved_echoes)} unresolved echoes, "
+            f"cancelled {cancelled_tasks} tasks"
+        )
+
+    async def _run_plugin(self, plugin: Plugin, handler: str, coro: Coroutine) -> None:
+        name = plugin.__class__.__name__
+        start = time.perf_counter()
+        try:
+            await coro
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings.record(f"plugin.{name}", seconds)
+            self.profiler.record_invocation(name, handler, seconds)
+
+    def _create_task(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        return task
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Task failed: {task.exception()!r}")
+
+    async def _run_loop_monitor(self):
+        asyncio.create_task(self.profiler.monitor_loop_lag())
+
+    async def _debug_endpoint(self, request: Request) -> Response:
+        token = self.config.profile_token
+        if not token or not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        ):
+            return Response(status_code=403)
+        report = request.path_params["report"]
+        if report == "cpu":
+            try:
+                seconds = float(request.query_params.get("seconds", 10))
+            except ValueError:
+                return Response(status_code=400)
+            if not 0 < seconds < float("inf"):
+                return Response(status_code=400)
+            summary = await self.profiler.profile_cpu(min(seconds, 300))
+        elif report == "lag":
+            summary = self.profiler.loop_lag()
+        elif report == "slow":
+            summary = self.profiler.slowest()
+        elif report == "tasks":
+            summary = self.profiler.tasks()
+        elif report == "memory":
+            if "stop" in request.query_params:
+                summary = self.profiler.stop_memory()
+            else:
+                summary = self.profiler.memory()
+        else:
+            return Response(status_code=404)
+        return JSONResponse({"summary": summary})
 
     async def _run_broadcast(self):
         asyncio.create_task(self._broadcast())
 
     async def _broadcast(self):
         while True:
+            action = await self.request_queue.get()
             try:
-                action = await self.request_queue.get()
-                tasks = [
-                    subscriber.put(action) for subscriber in self.subscribers.values()
-                ]
-                asyncio.gather(*tasks)
+                if not self.subscribers:
+                    self.dropped_actions += 1
+                    logger.warning(f"No client connected, dropped {action.action}")
+                for subscriber in self.subscribers.values():
+                    subscriber.put_nowait(action)
             except Exception as e:
                 logger.error(f"Failed to broadcast: {e}")
+            finally:
+                self.request_queue.task_done()
 
     async def _handle_event(self, post_type: str, event: dict):
         if post_type in ["message", "message_sent"]:
             base_message = BaseMessage(**event)
 
             if base_message.message_type == "group":
-                asyncio.create_task(self._handle_group_message_event(event))
+                self._create_task(self._handle_group_message_event(event))
 
             if base_message.message_type == "private":
-                asyncio.create_task(self._handle_private_message_event(event))
+                self._create_task(self._handle_private_message_event(event))
 
     async def _handle_response(self, response: dict):
         status = response.get("status", "")
@@ -75,12 +229,16 @@ class Plana:
         echo = response.get("echo", "")
         if echo:
             async with self.lock:
+                if echo not in self.response:
+                    logger.warning(f"[Response] Nobody is waiting for {echo}")
+                    return
                 event: asyncio.Event = self.response[echo]["event"]
                 self.response[echo]["response"] = response
                 event.set()
 
     async def _handle_private_message_event(self, event: dict):
-        message = PrivateMessage(**event)
+        with self.timings.measure("parse"):
+            message = PrivateMessage(**event)
         logger.info(message)
         if (
             not self.config.reply_private_message
@@ -95,17 +253,41 @@ class Plana:
             self.plugins,
         )
         plugins = list(plugins)
-        tasks = [plugin.handle_on_private(message) for plugin in plugins]
+        tasks = [
+            (plugin, "on_private", plugin.handle_on_private(message))
+            for plugin in plugins
+        ]
 
         plugins = filter(
             lambda plugin: plugin.prefix and message.on_prefix(plugin.prefix),
             plugins,
         )
-        tasks += [plugin.handle_on_private_prefix(message) for plugin in plugins]
-        asyncio.gather(*tasks)
+        with self.timings.measure("route"):
+            matches = self.router.match(message)
+        for plugin in plugins:
+            match = matches.get(id(plugin))
+            if match:
+                tasks.append(
+                    (
+                        plugin,
+                        match.command.func.__name__,
+                        plugin.handle_command(message, match),
+                    )
+                )
+            else:
+                tasks.append(
+                    (
+                        plugin,
+                        "on_private_prefix",
+                        plugin.handle_on_private_prefix(message),
+                    )
+                )
+        for plugin, handler, task in tasks:
+            self._create_task(self._run_plugin(plugin, handler, task))
 
     async def _handle_group_message_event(self, event: dict):
-        message = GroupMessage(**event)
+        with self.timings.measure("parse"):
+            message = GroupMessage(**event)
         logger.info(message)
 
         plugins = filter(
@@ -120,14 +302,36 @@ class Plana:
             self.plugins,
         )
         plugins = list(plugins)
-        tasks = [plugin.handle_on_group(message) for plugin in plugins]
+        tasks = [
+            (plugin, "on_group", plugin.handle_on_group(message)) for plugin in plugins
+        ]
 
         plugins = filter(
             lambda plugin: plugin.prefix and message.on_prefix(plugin.prefix),
             plugins,
         )
-        tasks += [plugin.handle_on_group_prefix(message) for plugin in plugins]
-        asyncio.gather(*tasks)
+        with self.timings.measure("route"):
+            matches = self.router.match(message)
+        for plugin in plugins:
+            match = matches.get(id(plugin))
+            if match:
+                tasks.append(
+                    (
+                        plugin,
+                        match.command.func.__name__,
+                        plugin.handle_command(message, match),
+                    )
+                )
+            else:
+                tasks.append(
+                    (
+                        plugin,
+                        "on_group_prefix",
+                        plugin.handle_on_group_prefix(message),
+                    )
+                )
+        for plugin, handler, task in tasks:
+            self._create_task(self._run_plugin(plugin, handler, task))
 
     def _init_plugins(self) -> None:
         enabled_plugins = list(map(lambda x: x.lower(), self.config.enabled_plugins))
@@ -156,11 +360,16 @@ class Plana:
                     and cls is not Plugin
                     and cls.__name__.lower() in enabled_plugins
                 ):
+                    store = self.store.namespace(cls.__name__) if self.store else None
                     plugin_config = {
                         "queue": self.request_queue,
                         "response": self.response,
                         "lock": self.lock,
                         "config": self.config.copy().dict(),
+                        "executor": self.executor,
+                        "http_api": self.http_api,
+                        "profiler": self.profiler,
+                        "store": store,
                     }
                     plugin_config = self._merge_dict(
                         plugin_config, self.config.plugins_config.get(filename, {})
@@ -170,39 +379,159 @@ class Plana:
                     except Exception as e:
                         logger.warning(f"Failed to load plugin: {cls.__name__}: {e}")
                         continue
-                    # FIXME: not sure if this is the best way to do this
-                    plugin.response = self.response
-
                     self.plugins.append(plugin)
+                    self.router.add_plugin(plugin)
         plugins_name = ", ".join([plugin.__class__.__name__ for plugin in self.plugins])
         logger.info(f"{len(self.plugins)} plugins Loaded: {plugins_name}")
 
+    async def _init_executor(self) -> None:
+        workers = self.config.process_pool_workers
+        if workers <= 0:
+            return
+        self.executor = create_process_pool(workers)
+        await warm_up_process_pool(self.executor, workers)
+        logger.info(f"Process pool started with {workers} workers")
+
+    def _shutdown_executor(self) -> None:
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+
+    def _close_recorder(self) -> None:
+        if self.recorder:
+            self.recorder.close()
+
+    async def _init_http_api(self) -> None:
+        if not self.config.http_api_url:
+            return
+        self.http_api = HttpApiClient(
+            self.config.http_api_url,
+            access_token=self.config.http_api_access_token,
+            pool_size=self.config.http_api_pool_size,
+            timeout=self.config.http_api_timeout,
+        )
+        queue = asyncio.Queue()
+        self.subscribers["http_api"] = queue
+        asyncio.create_task(self._send_request(self._send_http, queue))
+        logger.info(f"HTTP API client connected to {self.config.http_api_url}")
+
+    async def _init_store(self) -> None:
+        self.store = KVStore(
+            self.config.store_path,
+            flush_interval=self.config.store_flush_interval,
+            batch_size=self.config.store_batch_size,
+        )
+        self.store.start()
+
+    async def _close_store(self) -> None:
+        if self.store:
+            await self.store.close()
+
+    async def _close_http_api(self) -> None:
+        if self.http_api:
+            await self.http_api.close()
+
+    async def _send_http(self, action: Action) -> None:
+        if not self.http_api:
+            return
+        try:
+            response = await self.http_api.call(action)
+        except httpx.HTTPError as e:
+            response = {"status": "failed", "retcode": -1, "wording": repr(e)}
+        # The HTTP API answers on the same request, hand the echo back so the
+        # plugin waiting for this action gets the response.
+        if action.echo:
+            response["echo"] = action.echo
+        await self._handle_response(response)
+
+    async def _http_endpoint(self, request: Request) -> Response:
+        body = await request.body()
+        secret = self.config.http_post_secret
+        if secret and not verify_signature(
+            secret, body, request.headers.get("X-Signature", "")
+        ):
+            return Response(status_code=401)
+        try:
+            text = body.decode()
+            if self.recorder:
+                self.recorder.record("in", text)
+            with self.timings.measure("decode"):
+                data = json.loads(text)
+        except ValueError as e:
+            logger.warning(f"[Event] Malformed HTTP POST body: {e}")
+            return Response(status_code=400)
+        # A list body carries several events batched into a single request.
+        events = data if isinstance(data, list) else [data]
+        if not self.accepting:
+            # Let go-cqhttp know the events were not delivered.
+            self.refused_events += len(events)
+            return Response(status_code=503)
+        for event in events:
+            self._dispatch(event)
+        return Response(status_code=204)
+
+    def _dispatch(self, data: dict) -> None:
+        if not isinstance(data, dict):
+            logger.warning(f"[Event] Skipping malformed event: {data!r}")
+            return
+        post_type = data.get("post_type", None)
+        if post_type:
+            if not self.accepting:
+                self.refused_events += 1
+                return
+            self._create_task(self._handle_event(post_type, data))
+        else:
+            self._create_task(self._handle_response(data))
+
     async def _ws_endpoint(self, websocket: WebSocket):
         await websocket.accept()
         client = websocket.client
         if not client:
             return await websocket.close()
         client_name = f"{client.host}:{client.port}"
-        queue = asyncio.Queue()
-        self.subscribers[client_name] = queue
+        # With the HTTP API configured, actions go out over HTTP and the
+        # websocket only delivers events.
+        sender: asyncio.Task | None = None
+        if not self.http_api:
+            queue = asyncio.Queue()
+            self.subscribers[client_name] = queue
+            sender = asyncio.create_task(
+                self._send_request(
+                    lambda action: websocket.send_text(action.to_json()), queue
+                )
+            )
         logger.info(f"Client {client_name} connected")
 
-        asyncio.create_task(self._send_request(websocket, queue))
-        async for data in websocket.iter_json():
-            post_type = data.get("post_type", None)
-            if post_type:
-                asyncio.create_task(self._handle_event(post_type, data))
-            else:
-                asyncio.create_task(self._handle_response(data))
+        async for text in websocket.iter_text():
+            if self.recorder:
+                self.recorder.record("in", text)
+            try:
+                with self.timings.measure("decode"):
+                    data = json.loads(text)
+            except ValueError as e:
+                logger.warning(f"[Event] Malformed websocket frame: {e}")
+                continue
+            self._dispatch(data)
+        if sender:
+            sender.cancel()
         await websocket.close()
-        del self.subscribers[client_name]
+        self.subscribers.pop(client_name, None)
         logger.info(f"Client {client_name} disconnected")
 
-    async def _send_request(self, websocket: WebSocket, queue: asyncio.Queue):
+    async def _send_request(
+        self, send: Callable[[Action], Awaitable[None]], queue: asyncio.Queue
+    ):
         while True:
             action: Action = await queue.get()
-            await websocket.send_json(action.dict())
-            await asyncio.sleep(2)
+            try:
+                if self.recorder:
+                    self.recorder.record("out", action.to_json())
+                with self.timings.measure("send"):
+                    await send(action)
+            except Exception as e:
+                logger.error(f"Failed to send {action.action}: {e!r}")
+            finally:
+                queue.task_done()
+            await asyncio.sleep(self.config.send_interval)
 
     def _merge_dict(self, dict1, dict2):
         for key in dict2:
@@ -255,6 +584,16 @@ class Plana:
         logging.getLogger("fastapi").setLevel(logging.CRITICAL)
 
         self.app.add_event_handler("startup", self._print_ascii_art)
+        self.app.add_event_handler("startup", self._init_executor)
+        self.app.add_event_handler("startup", self._init_http_api)
+        self.app.add_event_handler("startup", self._init_store)
         self.app.add_event_handler("startup", self._init_plugins)
         self.app.add_event_handler("startup", self._run_broadcast)
+        self.app.add_event_handler("startup", self._run_loop_monitor)
+        self.app.add_event_handler("shutdown", self._shutdown_executor)
+        self.app.add_event_handler("shutdown", self._close_http_api)
+        self.app.add_event_handler("shutdown", self._close_recorder)
+        self.app.add_event_handler("shutdown", self._close_store)
         self.app.add_websocket_route("/ws", self._ws_endpoint)
+        self.app.add_route("/event", self._http_endpoint, methods=["POST"])
+        self.app.add_route("/debug/{report}", self._debug_endpoint)
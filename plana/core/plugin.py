@@ -1,24 +1,47 @@
 import asyncio
+import functools
+import pickle
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
 
-from pydantic import BaseModel
+from loguru import logger
+from pydantic import BaseModel, PrivateAttr
 
 from plana.actions import Action, GetLoginInfo, GroupMemberInfo, LoginInfo
 from plana.actions.get_group_member_info import GetGroupMemberInfo
 from plana.actions.get_group_msg_history import GetGroupMsgHistory
+from plana.actions.send_group_forward_msg import SendGroupForwardMessage
 from plana.actions.send_group_msg import SendGroupMessage
+from plana.actions.send_private_forward_msg import SendPrivateForwardMessage
 from plana.actions.send_private_msg import SendPrivateMessage
+from plana.core.command import CommandMatch
 from plana.core.config import PlanaConfig
+from plana.core.profiling import RuntimeProfiler
+from plana.core.store import PluginStore
+from plana.core.transport import HttpApiClient
 from plana.messages import GroupMessage, Message, PrivateMessage
+from plana.messages.split import split_message
+
+T = TypeVar("T")
 
 
 class Plugin(BaseModel):
     queue: asyncio.Queue
     lock: asyncio.Lock
-    response: dict[str, dict]
+    # Shared with Plana to match echoed responses. A bare ``dict`` keeps
+    # pydantic from copying it, a parametrized one would be validated into a
+    # new dict per plugin.
+    response: dict
     prefix: str | None = None
     master_only: bool = False
     config: PlanaConfig
+    executor: ProcessPoolExecutor | None = None
+    http_api: HttpApiClient | None = None
+    profiler: RuntimeProfiler | None = None
+    store: PluginStore | None = None
+
+    _login_info: LoginInfo | None = PrivateAttr(default=None)
 
     class Config:
         arbitrary_types_allowed = True
@@ -35,6 +58,9 @@ class Plugin(BaseModel):
     async def on_private_prefix(self, message: PrivateMessage) -> None:
         pass
 
+    async def on_shutdown(self) -> None:
+        pass
+
     async def handle_on_group(self, message: GroupMessage) -> None:
         message.load_plugin(self)
         return await self.on_group(message)
@@ -55,13 +81,45 @@ class Plugin(BaseModel):
             new_message = message.remove_prefix(self.prefix)
             return await self.on_private_prefix(new_message)
 
+    async def handle_command(
+        self, message: GroupMessage | PrivateMessage, match: CommandMatch
+    ) -> None:
+        message.load_plugin(self)
+        if match.error:
+            return await message.reply(match.error)
+        return await match.command.func(self, message, **match.kwargs)
+
     async def send_group_message(self, group_id: int, message: Message | str) -> None:
-        action = SendGroupMessage(params={"group_id": group_id, "message": message})
-        await self.queue.put(action)
+        parts = split_message(message, self.config.max_message_length)
+        if len(parts) == 1:
+            action = SendGroupMessage(params={"group_id": group_id, "message": message})
+            return await self.queue.put(action)
+        if len(parts) > self.config.forward_threshold:
+            nodes = await self._forward_nodes(parts)
+            if nodes:
+                action = SendGroupForwardMessage(
+                    params={"group_id": group_id, "messages": nodes}
+                )
+                return await self._send_with_retry(action)
+        for part in parts:
+            action = SendGroupMessage(params={"group_id": group_id, "message": part})
+            await self._send_with_retry(action)
 
     async def send_private_message(self, user_id: int, message: Message | str) -> None:
-        action = SendPrivateMessage(params={"user_id": user_id, "message": message})
-        await self.queue.put(action)
+        parts = split_message(message, self.config.max_message_length)
+        if len(parts) == 1:
+            action = SendPrivateMessage(params={"user_id": user_id, "message": message})
+            return await self.queue.put(action)
+        if len(parts) > self.config.forward_threshold:
+            nodes = await self._forward_nodes(parts)
+            if nodes:
+                action = SendPrivateForwardMessage(
+                    params={"user_id": user_id, "messages": nodes}
+                )
+                return await self._send_with_retry(action)
+        for part in parts:
+            action = SendPrivateMessage(params={"user_id": user_id, "message": part})
+            await self._send_with_retry(action)
 
     async def get_login_info(self) -> LoginInfo:
         action = GetLoginInfo()
@@ -80,15 +138,115 @@ class Plugin(BaseModel):
         response = await self._send_action_with_response(action)
         return [GroupMessage(**msg) for msg in response["data"]["messages"]]
 
+    async def run_cpu(
+        self, func: Callable[..., T], *args: Any, timeout: float | None = None
+    ) -> T:
+        """Run a CPU-bound function in the shared process pool.
+
+        ``func`` and its arguments are pickled, so ``func`` must be defined at
+        module level in an importable module (a plugin package, not a single
+        file plugin). Falls back to a thread when no pool is configured.
+
+        A timeout only stops waiting for the result: a running job cannot be
+        cancelled and keeps its worker busy until it returns, so jobs that may
+        never finish must bound their own work.
+        """
+        if timeout is None:
+            timeout = self.config.cpu_task_timeout
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(func, *args))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{getattr(func, '__qualname__', func)} timed out after {timeout}s, "
+                "it keeps occupying a process pool worker until it returns"
+            )
+            raise
+        except (pickle.PicklingError, AttributeError) as e:
+            # Local functions and lambdas fail with an AttributeError
+            # ("Can't pickle local object") instead of a PicklingError.
+            if isinstance(e, AttributeError) and "pickle" not in str(e):
+                raise
+            raise TypeError(
+                f"{getattr(func, '__qualname__', func)} and its arguments "
+                "must be picklable to run in the process pool"
+            ) from e
+
+    async def _forward_nodes(self, parts: list[Message | str]) -> list[dict] | None:
+        """Wrap the parts in forward nodes sent in the bot's own name.
+
+        Returns None when the bot's login info is unavailable, the parts are
+        then sent one by one instead.
+        """
+        if self._login_info is None:
+            try:
+                self._login_info = await asyncio.wait_for(
+                    self.get_login_info(), self.config.response_timeout
+                )
+            except Exception as e:
+                logger.warning(f"[Outbound] No login info for a forward message: {e!r}")
+                return None
+        return [
+            {
+                "type": "node",
+                "data": {
+                    "name": self._login_info.nickname,
+                    "uin": self._login_info.user_id,
+                    # Forward nodes cannot quote a message, drop the Reply.
+                    "content": [s for s in part if isinstance(s, dict)],
+                },
+            }
+            for part in parts
+        ]
+
+    async def _send_with_retry(self, action: Action) -> None:
+        """Send one part of a split message, waiting for it to be accepted.
+
+        Parts go through the action queue like any other message and are sent
+        one after another so they arrive in order. A part go-cqhttp reports as
+        failed is sent again up to ``send_retries`` times. A part without a
+        response within ``response_timeout`` may still have been delivered, it
+        is only sent again when ``retry_on_timeout`` is set.
+        """
+        for attempt in range(self.config.send_retries + 1):
+            try:
+                response = await asyncio.wait_for(
+                    self._queue_action_with_response(action),
+                    self.config.response_timeout,
+                )
+            except asyncio.TimeoutError:
+                if not self.config.retry_on_timeout:
+                    logger.error(f"[Outbound] {action.action} timed out")
+                    return
+                logger.warning(
+                    f"[Outbound] {action.action} timed out, attempt {attempt + 1}"
+                )
+                continue
+            if response.get("status") != "failed":
+                return
+            logger.warning(
+                f"[Outbound] {action.action} failed, attempt {attempt + 1}: {response}"
+            )
+        logger.error(f"[Outbound] Giving up on {action.action}")
+
     async def _send_action_with_response(self, action: Action) -> dict:
+        if self.http_api:
+            return await self.http_api.call(action)
+        return await self._queue_action_with_response(action)
+
+    async def _queue_action_with_response(self, action: Action) -> dict:
         uid = str(uuid.uuid4())
         action.echo = uid
         async with self.lock:
             event = asyncio.Event()
             self.response[uid] = {"event": event}
-        await self.queue.put(action)
-        response = await self._wait_for_response(event, uid)
-        return response
+        try:
+            await self.queue.put(action)
+            return await self._wait_for_response(event, uid)
+        finally:
+            async with self.lock:
+                self.response.pop(uid, None)
 
     async def _wait_for_response(self, event: asyncio.Event, key: str) -> dict:
         await event.wait()
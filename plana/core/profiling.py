@@ -0,0 +1,179 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread.
+
+    Stacks are counted in the folded format used by flamegraph tools, the
+    profiled thread itself is never interrupted.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: int) -> None:
+        self.stacks.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(thread_id,), name="plana-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        return self.stacks
+
+    def _run(self, thread_id: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class RuntimeProfiler:
+    """Collects runtime statistics of a live bot and writes reports on demand.
+
+    Every report is written to a file under ``profile_dir`` and a short
+    summary of it is returned.
+    """
+
+    def __init__(self, profile_dir: str, samples: int = 1000) -> None:
+        self.profile_dir = profile_dir
+        self.sampler = SamplingProfiler()
+        self.lags: deque[float] = deque(maxlen=samples)
+        self.invocations: deque[tuple[float, float, str, str]] = deque(maxlen=samples)
+        self._snapshot: tracemalloc.Snapshot | None = None
+
+    def record_invocation(self, plugin: str, handler: str, seconds: float) -> None:
+        self.invocations.append((seconds, time.time(), plugin, handler))
+
+    async def monitor_loop_lag(self, interval: float = 0.1) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.lags.append(max(loop.time() - start - interval, 0))
+
+    async def profile_cpu(self, seconds: float) -> str:
+        if self.sampler.running:
+            return "CPU profiler is already running"
+        self.sampler.start(threading.get_ident())
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stacks = self.sampler.stop()
+        path = self._write(
+            "cpu", "folded", [f"{stack} {count}" for stack, count in stacks.items()]
+        )
+
+        total = sum(stacks.values())
+        leaves: Counter[str] = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        lines = [f"CPU {seconds}s, {total} samples -> {path}"]
+        lines += [
+            f"{count / total:.1%} {leaf}" for leaf, count in leaves.most_common(5)
+        ]
+        return "\n".join(lines)
+
+    def loop_lag(self) -> str:
+        lags = sorted(self.lags)
+        if not lags:
+            return "No event loop lag samples yet"
+        p50 = lags[len(lags) // 2] * 1000
+        p99 = lags[min(len(lags) - 1, len(lags) * 99 // 100)] * 1000
+        summary = (
+            f"Loop lag over {len(lags)} samples: "
+            f"p50={p50:.2f}ms p99={p99:.2f}ms max={lags[-1] * 1000:.2f}ms"
+        )
+        path = self._write("lag", "txt", [summary, *map(str, self.lags)])
+        return f"{summary} -> {path}"
+
+    def slowest(self, limit: int = 3) -> str:
+        by_plugin: dict[str, list[tuple[float, float, str, str]]] = {}
+        for invocation in self.invocations:
+            by_plugin.setdefault(invocation[2], []).append(invocation)
+        lines = []
+        for plugin, invocations in sorted(by_plugin.items()):
+            invocations.sort(reverse=True)
+            for seconds, at, _, handler in invocations[:limit]:
+                lines.append(
+                    f"{plugin}.{handler} {seconds * 1000:.1f}ms "
+                    f"at {time.strftime('%H:%M:%S', time.localtime(at))}"
+                )
+        if not lines:
+            return "No handler invocations recorded yet"
+        path = self._write("slow", "txt", lines)
+        return "\n".join([f"Slowest handlers -> {path}", *lines])
+
+    def tasks(self) -> str:
+        counts = Counter(
+            getattr(task.get_coro(), "__qualname__", repr(task.get_coro()))
+            for task in asyncio.all_tasks()
+        )
+        lines = [f"{count} {name}" for name, count in counts.most_common()]
+        path = self._write("tasks", "txt", lines)
+        summary = f"{sum(counts.values())} tasks -> {path}"
+        return "\n".join([summary, *lines[:5]])
+
+    def memory(self, limit: int = 5) -> str:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+            return (
+                "tracemalloc started, run again to see what grew "
+                "and stop it when done, tracing slows everything down"
+            )
+        snapshot = tracemalloc.take_snapshot()
+        if self._snapshot:
+            stats = snapshot.compare_to(self._snapshot, "lineno")
+        else:
+            stats = snapshot.statistics("lineno")
+        self._snapshot = snapshot
+        path = self._write("memory", "txt", [str(stat) for stat in stats])
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Memory {current / 1024 / 1024:.1f}MiB "
+            f"(peak {peak / 1024 / 1024:.1f}MiB) -> {path}"
+        ]
+        lines += [str(stat) for stat in stats[:limit]]
+        return "\n".join(lines)
+
+    def stop_memory(self) -> str:
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is not running"
+        tracemalloc.stop()
+        self._snapshot = None
+        return "tracemalloc stopped"
+
+    def _write(self, kind: str, extension: str, lines: list[str]) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        path = os.path.join(
+            self.profile_dir, f"{kind}-{stamp}-{int(now * 1000) % 1000:03d}.{extension}"
+        )
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+import time
+from typing import IO, Iterator
+
+
+class Recorder:
+    """Appends timestamped raw frames to a gzip compressed JSON lines file.
+
+    Once ``max_bytes`` of uncompressed frames have been written the file is
+    rotated to ``<path>.1``, older recordings shift up and at most ``backups``
+    of them are kept. A recording left over from an earlier run is rotated
+    on open, its uncompressed size is unknown without reading it back.
+    """
+
+    def __init__(self, path: str, *, max_bytes: int, backups: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file: IO[bytes] | None = None
+        self._written = 0
+
+    def record(self, direction: str, frame: str) -> None:
+        if self._file is None:
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                self.rotate()
+            self._file = gzip.open(self.path, "wb")
+            self._written = 0
+        line = json.dumps(
+            {"t": time.time(), "d": direction, "f": frame}, ensure_ascii=False
+        )
+        data = line.encode() + b"\n"
+        self._file.write(data)
+        self._written += len(data)
+        if self._written >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self) -> None:
+        self.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_recording(path: str) -> Iterator[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            # The tail of a recording that was not closed cleanly is cut off.
+            return
@@ -0,0 +1,171 @@
+import asyncio
+import copy
+import cProfile
+import json
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING, Iterator
+from unittest.mock import patch
+
+import httpx
+from loguru import logger
+
+from plana.actions import Action
+from plana.core.recorder import read_recording
+
+if TYPE_CHECKING:
+    from plana.core.plana import Plana
+
+
+# An empty assistant reply in the shape returned by ``openai.ChatCompletion``.
+STUB_COMPLETION = {
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": ""},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+}
+
+
+@contextmanager
+def stub_http() -> Iterator[None]:
+    """Keep plugins off the network while a recording is replayed.
+
+    httpx requests, sync and async, get an empty 200 response and OpenAI chat
+    completions an empty assistant reply.
+    """
+
+    def send(client: httpx.Client, request: httpx.Request, **kwargs):
+        return httpx.Response(200, request=request, text="")
+
+    async def async_send(client: httpx.AsyncClient, request: httpx.Request, **kwargs):
+        return send(client, request)
+
+    def create(*args, **kwargs):
+        return copy.deepcopy(STUB_COMPLETION)
+
+    async def acreate(*args, **kwargs):
+        return create()
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(httpx.Client, "send", send))
+        stack.enter_context(patch.object(httpx.AsyncClient, "send", async_send))
+        try:
+            import openai
+        except ImportError:
+            pass
+        else:
+            stack.enter_context(patch.object(openai.ChatCompletion, "create", create))
+            stack.enter_context(patch.object(openai.ChatCompletion, "acreate", acreate))
+        yield
+
+
+class Replayer:
+    """Replays recorded inbound frames through a Plana instance.
+
+    Recorded action responses are not dispatched as they arrive. They are
+    paired with the recorded action by echo and handed out, in order, to the
+    replayed actions of the same name that wait for a response.
+    """
+
+    def __init__(self, plana: "Plana", path: str, *, realtime: bool) -> None:
+        self.plana = plana
+        self.path = path
+        self.realtime = realtime
+        self.responses: dict[str, deque[dict]] = {}
+        self.frames = 0
+        self.actions = 0
+
+    async def run(self, profile: str | None = None) -> None:
+        plana = self.plana
+        plana.recorder = None
+        plana.config.send_interval = 0
+        await plana._init_executor()
+        plana._init_plugins()
+        await plana._run_broadcast()
+        queue = asyncio.Queue()
+        plana.subscribers["replay"] = queue
+        asyncio.create_task(plana._send_request(self._send, queue))
+
+        records = list(read_recording(self.path))
+        # Responses without an echo answer actions nobody waits for, such as
+        # a plain send_group_msg, and are never handed out.
+        actions: dict[str, str] = {}
+        for record in records:
+            frame = json.loads(record["f"])
+            for data in frame if isinstance(frame, list) else [frame]:
+                if not isinstance(data, dict) or not data.get("echo"):
+                    continue
+                if record["d"] == "out":
+                    actions[data["echo"]] = data.get("action", "")
+                elif not data.get("post_type") and data["echo"] in actions:
+                    name = actions[data["echo"]]
+                    self.responses.setdefault(name, deque()).append(data)
+        records = [record for record in records if record["d"] == "in"]
+
+        profiler = cProfile.Profile() if profile else None
+        with stub_http():
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            await self._feed(records)
+            await self._settle(queue)
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+        plana._shutdown_executor()
+
+        if profiler and profile:
+            profiler.dump_stats(profile)
+            logger.info(f"[Replay] Profile written to {profile}")
+        logger.info(
+            f"[Replay] {self.frames} frames, {self.actions} actions "
+            f"in {elapsed:.3f}s"
+        )
+        for line in plana.timings.summary():
+            logger.info(f"[Replay] {line}")
+
+    async def _feed(self, records: list[dict]) -> None:
+        if not records:
+            return
+        loop = asyncio.get_running_loop()
+        started_at, first = loop.time(), records[0]["t"]
+        for record in records:
+            if self.realtime:
+                delay = record["t"] - first - (loop.time() - started_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            with self.plana.timings.measure("decode"):
+                frame = json.loads(record["f"])
+            for data in frame if isinstance(frame, list) else [frame]:
+                if isinstance(data, dict) and data.get("post_type"):
+                    self.frames += 1
+                    self.plana._dispatch(data)
+            # Let the dispatched tasks run between frames like a live socket does.
+            await asyncio.sleep(0)
+
+    async def _settle(self, queue: asyncio.Queue) -> None:
+        while True:
+            while self.plana.tasks:
+                await asyncio.wait(set(self.plana.tasks))
+            await self.plana.request_queue.join()
+            await queue.join()
+            if not self.plana.tasks:
+                return
+
+    async def _send(self, action: Action) -> None:
+        action.to_json()
+        self.actions += 1
+        if not action.echo:
+            return
+        responses = self.responses.get(action.action)
+        if responses:
+            response = dict(responses.popleft())
+        else:
+            response = {"status": "failed", "retcode": -1, "data": None}
+        response["echo"] = action.echo
+        self.plana._dispatch(response)
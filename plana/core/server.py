@@ -0,0 +1,19 @@
+import socket
+from typing import TYPE_CHECKING
+
+import uvicorn
+
+if TYPE_CHECKING:
+    from plana.core.plana import Plana
+
+
+class PlanaServer(uvicorn.Server):
+    """Drains Plana before uvicorn closes the websocket connections."""
+
+    def __init__(self, config: uvicorn.Config, plana: "Plana") -> None:
+        super().__init__(config)
+        self.plana = plana
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        await self.plana.drain()
+        await super().shutdown(sockets)
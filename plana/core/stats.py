@@ -0,0 +1,45 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StageTimings:
+    """Keeps count, total and the most recent samples of how long each stage took."""
+
+    def __init__(self, samples: int = 1000) -> None:
+        self.samples = samples
+        self.counts: dict[str, int] = {}
+        self.totals: dict[str, float] = {}
+        self.recent: dict[str, deque[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        if stage not in self.recent:
+            self.recent[stage] = deque(maxlen=self.samples)
+        self.recent[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> list[str]:
+        lines = [
+            f"{'stage':<32}{'count':>8}{'total(s)':>10}"
+            f"{'mean(ms)':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"
+        ]
+        for stage in sorted(self.totals, key=self.totals.__getitem__, reverse=True):
+            recent = sorted(self.recent[stage])
+            lines.append(
+                f"{stage:<32}{self.counts[stage]:>8}{self.totals[stage]:>10.3f}"
+                f"{self.totals[stage] / self.counts[stage] * 1000:>10.2f}"
+                f"{recent[len(recent) // 2] * 1000:>10.2f}"
+                f"{recent[min(len(recent) - 1, len(recent) * 99 // 100)] * 1000:>10.2f}"
+                f"{recent[-1] * 1000:>10.2f}"
+            )
+        return lines
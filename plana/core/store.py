@@ -0,0 +1,209 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from loguru import logger
+
+# Marks a key that was deleted in memory but not yet in SQLite.
+_DELETED = object()
+
+
+class KVStore:
+    """Key-value store kept in memory and written behind to SQLite.
+
+    Reads and writes only touch the in-memory cache. Changed keys are flushed
+    to SQLite in batches from a background task, off the event loop. Values
+    are kept JSON encoded, exactly as they are persisted, so a read returns a
+    fresh copy that looks the same before and after a restart. They must be
+    JSON serializable, :meth:`set` raises ``TypeError`` otherwise.
+
+    Every namespace is loaded from SQLite once, on first access, and never
+    refreshed. The store is meant for a single process: two processes on the
+    same file do not see each other's writes and overwrite each other's
+    values, ``incr`` counters included.
+    """
+
+    def __init__(
+        self, path: str, *, flush_interval: float = 1, batch_size: int = 500
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.data: dict[str, dict[str, tuple[str, float | None]]] = {}
+        self.dirty: set[tuple[str, str]] = set()
+        self._db_lock = threading.Lock()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._flusher: asyncio.Task | None = None
+        self._flushed = asyncio.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "namespace TEXT, key TEXT, value TEXT, expires_at REAL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+    def namespace(self, name: str) -> "PluginStore":
+        return PluginStore(self, name)
+
+    def start(self) -> None:
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"[Store] {len(self.dirty)} keys were not saved: {e!r}")
+        await asyncio.to_thread(self._close)
+
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        entries = await self._entries(namespace)
+        value, expires_at = entries.get(key, (_DELETED, None))
+        if value is _DELETED:
+            return default
+        if expires_at is not None and expires_at <= time.time():
+            self._put(namespace, key, _DELETED, None)
+            return default
+        return json.loads(value)
+
+    async def set(
+        self, namespace: str, key: str, value: Any, ttl: float | None = None
+    ) -> None:
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+        # Encoding here makes a bad value fail in the caller and not later in
+        # the background flush.
+        encoded = json.dumps(value)
+        await self._entries(namespace)
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._put(namespace, key, encoded, expires_at)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await self._entries(namespace)
+        self._put(namespace, key, _DELETED, None)
+
+    async def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        entries = await self._entries(namespace)
+        # Nothing awaits between the read and the write, so no other coroutine
+        # can interleave and the increment is atomic.
+        encoded, expires_at = entries.get(key, (_DELETED, None))
+        expired = expires_at is not None and expires_at <= time.time()
+        if encoded is _DELETED or expired:
+            value, expires_at = 0, None
+        else:
+            value = json.loads(encoded)
+        value += amount
+        self._put(namespace, key, json.dumps(value), expires_at)
+        return value
+
+    async def flush(self) -> None:
+        while self.dirty:
+            size = min(len(self.dirty), self.batch_size)
+            batch = [self.dirty.pop() for _ in range(size)]
+            upserts, deletes = [], []
+            for namespace, key in batch:
+                value, expires_at = self.data[namespace].get(key, (_DELETED, None))
+                if value is _DELETED:
+                    deletes.append((namespace, key))
+                else:
+                    upserts.append((namespace, key, value, expires_at))
+            try:
+                await asyncio.to_thread(self._write, upserts, deletes)
+            except BaseException:
+                # Keep the batch for the next flush instead of losing it.
+                self.dirty.update(batch)
+                raise
+            for namespace, key in deletes:
+                entries = self.data[namespace]
+                if key in entries and entries[key][0] is _DELETED:
+                    del entries[key]
+
+    def _put(
+        self, namespace: str, key: str, value: Any, expires_at: float | None
+    ) -> None:
+        self.data[namespace][key] = (value, expires_at)
+        self.dirty.add((namespace, key))
+        if len(self.dirty) >= self.batch_size:
+            self._flushed.set()
+
+    async def _entries(self, namespace: str) -> dict[str, tuple[str, float | None]]:
+        if namespace in self.data:
+            return self.data[namespace]
+        if namespace not in self._loading:
+            self._loading[namespace] = asyncio.create_task(
+                asyncio.to_thread(self._read, namespace)
+            )
+        entries = await self._loading[namespace]
+        self.data.setdefault(namespace, entries)
+        return self.data[namespace]
+
+    async def _flush_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flushed.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flushed.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[Store] Flush failed, retrying later: {e!r}")
+
+    def _read(self, namespace: str) -> dict[str, tuple[str, float | None]]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM kv "
+                "WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time()),
+            ).fetchall()
+        return {key: (value, expires_at) for key, value, expires_at in rows}
+
+    def _write(
+        self,
+        upserts: list[tuple[str, str, str, float | None]],
+        deletes: list[tuple[str, str]],
+    ) -> None:
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", upserts
+            )
+            self._conn.executemany(
+                "DELETE FROM kv WHERE namespace = ? AND key = ?", deletes
+            )
+            self._conn.execute(
+                "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+
+    def _close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+
+class PluginStore:
+    """The part of a :class:`KVStore` that belongs to a single plugin."""
+
+    def __init__(self, store: KVStore, namespace: str) -> None:
+        self.kv = store
+        self.namespace = namespace
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return await self.kv.get(self.namespace, key, default)
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        await self.kv.set(self.namespace, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.kv.delete(self.namespace, key)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self.kv.incr(self.namespace, key, amount)
@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+
+import httpx
+
+from plana.actions.action import Action, dumps
+
+
+class HttpApiClient:
+    """Calls go-cqhttp's HTTP API over a pool of keep-alive connections.
+
+    Every call gets its own response, so request/response actions can run in
+    parallel without echo bookkeeping.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        access_token: str = "",
+        pool_size: int = 10,
+        timeout: float = 10,
+    ) -> None:
+        headers = {"Content-Type": "application/json"}
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    async def call(self, action: Action) -> dict:
+        response = await self.client.post(
+            f"/{action.action}", content=dumps(action.params)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    """Check the ``X-Signature`` header go-cqhttp sends with HTTP POST events."""
+    expected = "sha1=" + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+    return hmac.compare_digest(expected, signature)
@@ -0,0 +1,78 @@
+from plana.messages.message import Message
+
+# Preferred places to cut long text, best first.
+SEPARATORS = [
+    "\n\n",
+    "\n",
+    "。",
+    "！",
+    "？",
+    ". ",
+    "! ",
+    "? ",
+    "；",
+    "; ",
+    "，",
+    ", ",
+    " ",
+]
+
+
+def split_text(text: str, limit: int) -> list[str]:
+    """Split text into pieces of at most ``limit`` characters.
+
+    Cuts at the best separator found in the second half of each piece, so
+    pieces are never much shorter than the limit, or hard at the limit.
+    """
+    pieces = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = limit
+        for separator in SEPARATORS:
+            index = window.rfind(separator)
+            if index >= limit // 2:
+                cut = index + len(separator)
+                break
+        if piece := text[:cut].rstrip("\n"):
+            pieces.append(piece)
+        text = text[cut:].lstrip("\n")
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def message_size(message: Message | str) -> int:
+    if isinstance(message, str):
+        return len(message)
+    return sum(
+        len(segment["data"]["text"])
+        for segment in message
+        if isinstance(segment, dict) and segment.get("type") == "text"
+    )
+
+
+def split_message(message: Message | str, limit: int) -> list[Message | str]:
+    """Split a message whose text is longer than ``limit`` into ordered parts.
+
+    Non-text segments such as replies and images stay in the part they were
+    in. A message that fits is returned as is.
+    """
+    if message_size(message) <= limit:
+        return [message]
+    if isinstance(message, str):
+        text, message = message, Message()
+        message.add_text(text)
+
+    parts = [Message()]
+    size = 0
+    for segment in message:
+        if not (isinstance(segment, dict) and segment.get("type") == "text"):
+            parts[-1].append(segment)
+            continue
+        for piece in split_text(segment["data"]["text"], limit):
+            if size and size + len(piece) > limit:
+                parts.append(Message())
+                size = 0
+            parts[-1].add_text(piece)
+            size += len(piece)
+    return [*parts]
@@ -12,6 +12,8 @@ from plana.messages.private_message import PrivateMessage
 
 
 class Bilibili(Plugin):
+    offload_threshold: int = 64 * 1024
+
     async def on_private(self, private_message: PrivateMessage):
         urls = await self.parse_message(private_message.message)
         if urls:
@@ -27,19 +29,13 @@ class Bilibili(Plugin):
         for part in message:
             msg_type = part.get("type")
             if msg_type == "json":
-                json_data = json.loads(part["data"]["data"])
-                if get_nested_value(json_data, ["appID"], "") == "100951776":
-                    if short_url := get_nested_value(
-                        json_data,
-                        ["meta", "detail_1", "qqdocurl"],
-                    ):
-                        short_urls.append(short_url)
-                elif get_nested_value(json_data, ["extra", "appid"], 0) == 100951776:
-                    if short_url := get_nested_value(
-                        json_data,
-                        ["meta", "news", "jumpUrl"],
-                    ):
-                        short_urls.append(short_url)
+                raw = part["data"]["data"]
+                if len(raw) > self.offload_threshold:
+                    short_url = await self.run_cpu(extract_short_url, raw)
+                else:
+                    short_url = extract_short_url(raw)
+                if short_url:
+                    short_urls.append(short_url)
             elif msg_type == "text":
                 text = part["data"]["text"]
                 pattern = r"https://b23\.tv/[\w\d]+"
@@ -76,6 +72,20 @@ class Bilibili(Plugin):
         return new_url
 
 
+def extract_short_url(raw: str) -> str | None:
+    """Return the short URL of a Bilibili mini-app card, if ``raw`` is one.
+
+    Runs in the process pool for large cards, so only the URL is sent back
+    to the event loop instead of the whole parsed card.
+    """
+    json_data = json.loads(raw)
+    if get_nested_value(json_data, ["appID"], "") == "100951776":
+        return get_nested_value(json_data, ["meta", "detail_1", "qqdocurl"])
+    if get_nested_value(json_data, ["extra", "appid"], 0) == 100951776:
+        return get_nested_value(json_data, ["meta", "news", "jumpUrl"])
+    return None
+
+
 def get_nested_value(dictionary, keys, default=None):
     if isinstance(dictionary, dict) and keys:
         key = keys[0]
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+from openai_agent.messages import Message
+from pydantic import BaseModel
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache whose entries also expire ``ttl`` seconds after last write."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Exchange(BaseModel):
+    """One question and its answer, kept together so trimming never splits them."""
+
+    messages: list[Message]
+    tokens: int
+
+
+class Conversation(BaseModel):
+    exchanges: list[Exchange] = []
+
+    def trim(self, budget: int) -> int:
+        """Drop the oldest exchanges until the history fits in ``budget`` tokens.
+
+        Returns the number of tokens removed.
+        """
+        removed = 0
+        while self.exchanges and self.tokens > budget:
+            removed += self.exchanges.pop(0).tokens
+        return removed
+
+    @property
+    def tokens(self) -> int:
+        return sum(exchange.tokens for exchange in self.exchanges)
+
+    @property
+    def messages(self) -> list[Message]:
+        return [message for exchange in self.exchanges for message in exchange.messages]
+
+
+class ChatStats(BaseModel):
+    requests: int = 0
+    response_hits: int = 0
+    conversation_hits: int = 0
+    tokens_sent: int = 0
+    tokens_saved: int = 0
+    tokens_trimmed: int = 0
+
+    @property
+    def response_hit_rate(self) -> float:
+        return self.response_hits / self.requests if self.requests else 0.0
+
+    @property
+    def conversation_hit_rate(self) -> float:
+        return self.conversation_hits / self.requests if self.requests else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"requests={self.requests} "
+            f"response_hit_rate={self.response_hit_rate:.1%} "
+            f"conversation_hit_rate={self.conversation_hit_rate:.1%} "
+            f"tokens_sent={self.tokens_sent} "
+            f"tokens_saved={self.tokens_saved} "
+            f"tokens_trimmed={self.tokens_trimmed}"
+        )
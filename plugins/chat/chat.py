@@ -4,10 +4,14 @@ from loguru import logger
 from openai_agent.completions import get_function_completion
 from openai_agent.functions import Function
 from openai_agent.messages import Message, UserMessage
+from pydantic import PrivateAttr
 
 from plana import Plugin
 from plana.messages import BaseMessage, GroupMessage, PrivateMessage
 
+from .cache import ChatStats, Conversation, Exchange, TTLCache
+from .utils import count_tokens
+
 
 def get(url: str) -> str:
     """Get text from url.
@@ -23,10 +27,24 @@ functions = [Function.load_from_func(get)]
 class Chat(Plugin):
     prefix: str = "#chat"
     openai_api_key: str = ""
+    model: str = "gpt-3.5-turbo-16k-0613"
+    max_context_tokens: int = 4096
+    max_conversations: int = 256
+    conversation_ttl: int = 1800
+    response_cache_size: int = 512
+    response_cache_ttl: int = 600
+    stats_interval: int = 50
+    offload_threshold: int = 16 * 1024
+
+    _conversations: TTLCache[tuple[int, int], Conversation] = PrivateAttr()
+    _responses: TTLCache[tuple, Message] = PrivateAttr()
+    _stats: ChatStats = PrivateAttr(default_factory=ChatStats)
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         openai.api_key = self.openai_api_key
+        self._conversations = TTLCache(self.max_conversations, self.conversation_ttl)
+        self._responses = TTLCache(self.response_cache_size, self.response_cache_ttl)
 
     async def on_group(self, message: GroupMessage) -> None:
         if not message.at_bot():
@@ -41,14 +59,54 @@ class Chat(Plugin):
 
     async def _chat(self, message: BaseMessage) -> None:
         question = message.plain_text()
-        messages: list[Message] = [UserMessage(content=question)]
+        question_tokens = await self._calc_tokens(question)
+        conversation_key = (getattr(message, "group_id", 0), message.user_id)
+        conversation = self._conversations.get(conversation_key)
+        self._stats.requests += 1
+        if conversation is None:
+            conversation = Conversation()
+        else:
+            self._stats.conversation_hits += 1
+        self._stats.tokens_trimmed += conversation.trim(
+            self.max_context_tokens - question_tokens
+        )
+
+        messages: list[Message] = conversation.messages
+        messages.append(UserMessage(content=question))
+        prompt_tokens = conversation.tokens + question_tokens
+        response_key = tuple((m.role, m.content) for m in messages)
         try:
-            response = get_function_completion(
-                model="gpt-3.5-turbo-16k-0613",
-                messages=messages,
-                functions=functions,
-            )
+            response = self._responses.get(response_key)
+            if response is None:
+                # get_function_completion appends function calls to the list it is
+                # given, pass a copy so they do not leak into the history.
+                response = get_function_completion(
+                    model=self.model,
+                    messages=list(messages),
+                    functions=functions,
+                )
+                self._responses.set(response_key, response)
+                self._stats.tokens_sent += prompt_tokens
+            else:
+                self._stats.response_hits += 1
+                self._stats.tokens_saved += prompt_tokens
             await message.reply(response.content)
         except Exception as e:
             logger.warning(f"failed to run agent: {e}")
             await message.reply("出错啦，请稍后再试")
+            return
+
+        conversation.exchanges.append(
+            Exchange(
+                messages=[messages[-1], response],
+                tokens=question_tokens + await self._calc_tokens(response.content),
+            )
+        )
+        self._conversations.set(conversation_key, conversation)
+        if self.stats_interval and self._stats.requests % self.stats_interval == 0:
+            logger.info(f"[Chat] {self._stats}")
+
+    async def _calc_tokens(self, text: str) -> int:
+        if len(text) > self.offload_threshold:
+            return await self.run_cpu(count_tokens, text)
+        return count_tokens(text)
@@ -23,5 +23,5 @@ async def get_completion(
     return response["choices"][0]["message"]["content"]
 
 
-async def calc_tokens(prompt: str) -> int:
+def count_tokens(prompt: str) -> int:
     return len(encoding.encode(prompt))
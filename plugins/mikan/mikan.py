@@ -4,7 +4,7 @@ import xml.etree.ElementTree as ET
 import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from plana import Plugin
 
@@ -18,15 +18,22 @@ class MikanAnime(Plugin):
     rss_url: str
     previous_records: list[str] = []
 
+    _scheduler: AsyncIOScheduler = PrivateAttr()
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
-        scheduler = AsyncIOScheduler()
-        scheduler.add_job(self.check_update, "interval", seconds=180)
-        scheduler.start()
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(self.check_update, "interval", seconds=180)
+        self._scheduler.start()
+
+    async def on_shutdown(self) -> None:
+        self._scheduler.shutdown(wait=False)
 
     async def check_update(self) -> None:
         logger.debug("[MikanAnime] Start check update")
+        if self.store and not self.previous_records:
+            self.previous_records = await self.store.get("previous_records", [])
         async with httpx.AsyncClient() as client:
             try:
                 response = await client.get(self.rss_url, timeout=3)
@@ -34,13 +41,11 @@ class MikanAnime(Plugin):
                 logger.error(f"[Mikan] Failed to fetch rss: {e}")
                 return
 
-        rss: ET.Element = ET.fromstring(response.text)
-        rss_items = rss.findall("./channel/item")
-
-        anime_items: list[AnimeItem] = [
-            AnimeItem(title=i.find("title").text, link=i.find("link").text)  # type: ignore  # noqa: E501
-            for i in rss_items
-        ]
+        try:
+            anime_items = await self.run_cpu(parse_rss, response.text)
+        except Exception as e:
+            logger.error(f"[Mikan] Failed to parse rss: {e}")
+            return
 
         new_anime_items = [
             i for i in anime_items if i.title not in self.previous_records
@@ -52,10 +57,22 @@ class MikanAnime(Plugin):
         message_list.insert(0, "老师, 你订阅的番剧更新了:")
         message: str = "\n".join(message_list)
 
-        asyncio.gather(
-            *[
-                self.send_group_message(gid, message)
-                for gid in self.config.allowed_groups
-            ]
-        ) if self.previous_records else None
+        if self.previous_records:
+            await asyncio.gather(
+                *[
+                    self.send_group_message(gid, message)
+                    for gid in self.config.allowed_groups
+                ]
+            )
         self.previous_records = [i.title for i in anime_items]
+        if self.store:
+            await self.store.set("previous_records", self.previous_records)
+
+
+def parse_rss(text: str) -> list[AnimeItem]:
+    rss: ET.Element = ET.fromstring(text)
+    rss_items = rss.findall("./channel/item")
+    return [
+        AnimeItem(title=i.find("title").text, link=i.find("link").text)  # type: ignore  # noqa: E501
+        for i in rss_items
+    ]
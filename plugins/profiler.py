@@ -0,0 +1,36 @@
+from plana import Plugin, command
+from plana.messages import BaseMessage
+
+
+class Profiler(Plugin):
+    prefix = "#profile"
+    master_only = True
+
+    @command("cpu <seconds>")
+    async def cpu(self, message: BaseMessage, seconds: int):
+        if seconds <= 0:
+            return await message.reply(f"用法: {self.prefix} cpu <seconds>")
+        await self._report(await self.profiler.profile_cpu(min(seconds, 300)))
+
+    @command("lag")
+    async def lag(self, message: BaseMessage):
+        await self._report(self.profiler.loop_lag())
+
+    @command("slow")
+    async def slow(self, message: BaseMessage):
+        await self._report(self.profiler.slowest())
+
+    @command("tasks")
+    async def tasks(self, message: BaseMessage):
+        await self._report(self.profiler.tasks())
+
+    @command("memory")
+    async def memory(self, message: BaseMessage):
+        await self._report(self.profiler.memory())
+
+    @command("memory stop")
+    async def memory_stop(self, message: BaseMessage):
+        await self._report(self.profiler.stop_memory())
+
+    async def _report(self, summary: str) -> None:
+        await self.send_private_message(self.config.master_id, summary)